@@ -7,20 +7,33 @@
 # - Football (football-data.org): today, standings, scorers
 # - Pastel/neo-morphic UI with gradient hero, soft cards, KPI tiles
 
-import os, json, time, threading, queue, requests
+import os, json, time, threading, queue, contextvars, requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import plotly.io as pio
 import streamlit as st
 import streamlit.components.v1 as components
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import yfinance as yf
+from curl_cffi import requests as curl_requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from websocket import WebSocketApp
 from dotenv import load_dotenv
 from pathlib import Path
 from datetime import datetime as _dt, date as _date, timedelta as _timedelta
 from meteostat import Daily, Point
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # stdlib fallback
+    _json_loads = json.loads
+
 # ---------------- Env ----------------
 dotenv_path = Path(__file__).with_name(".env")
 load_dotenv(dotenv_path=dotenv_path, override=True)
@@ -31,13 +44,31 @@ DEFAULT_CITIES = os.getenv("DEFAULT_CITIES", "Toronto,CA;Lagos,NG;London,GB")
 # ---------------- Page ----------------
 st.set_page_config(page_title="Markets • Weather • Football", layout="wide")
 
+# ---------------- HTTP ----------------
+# One pooled keep-alive session for OWM / Binance / football-data.
+# cache_resource keeps the pool alive across Streamlit reruns.
+@st.cache_resource(show_spinner=False)
+def _http_session():
+    s = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16, pool_maxsize=32,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504]),
+    )
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+    return s
+
+SESSION = _http_session()
+
 # ---------------- Theme / CSS ----------------
 ACCENT = "#7c3aed"  # purple
 GRAD_L = "#eef2ff"  # light indigo
 GRAD_R = "#e9fdf6"  # mint
 
-st.markdown(
-    f"""
+@st.cache_resource
+def _css():
+    return f"""
 <style>
 @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800&display=swap');
 html, body, [class*="css"] {{ font-family: Inter, system-ui, -apple-system, Segoe UI, Roboto, "Helvetica Neue", Arial, "Noto Sans", "Apple Color Emoji","Segoe UI Emoji"; }}
@@ -119,9 +150,9 @@ div.block-container {{ padding-top: .8rem; max-width: 1320px; }}
 
 .spark .js-plotly-plot .plotly .modebar{{ display:none; }}
 </style>
-""",
-    unsafe_allow_html=True,
-)
+"""
+
+st.markdown(_css(), unsafe_allow_html=True)
 
 # ---------------- Plotly palette ----------------
 pio.templates["nova_light"] = pio.templates["plotly_white"]
@@ -172,52 +203,65 @@ with st.sidebar:
     st.markdown('</div>', unsafe_allow_html=True)
 
 # ---------------- Hero ----------------
-st.markdown(
-    """
+@st.cache_resource
+def _hero_html():
+    return """
 <div class="hero">
   <div style="display:flex; align-items:center; gap:12px;">
     <div class="badge"><span>MWF</span> Markets • Weather • Football</div>
   </div>
 </div>
-""",
-    unsafe_allow_html=True,
-)
+"""
+
+st.markdown(_hero_html(), unsafe_allow_html=True)
 
 # ---------------- Helpers ----------------
-def tv_embed(symbol: str, height=520, interval="60", theme="light", chart_type="1"):
-    html = f"""
+@st.cache_resource
+def _tv_html(symbol: str, height=520, interval="60", theme="light", chart_type="1"):
+    return f"""
     <div class="card" style="padding:0;">
-      <iframe
+      <iframe loading="lazy"
         src="https://s.tradingview.com/widgetembed/?symbol={symbol}&interval={interval}&hidesidetoolbar=1&symboledit=1&saveimage=1&toolbarbg=f1f3f6&studies=[]&theme={theme}&style={chart_type}&locale=en"
         width="100%" height="{height}" frameborder="0" allowtransparency="true" scrolling="no"></iframe>
     </div>
     """
-    components.html(html, height=height+2)
+
+def tv_embed(symbol: str, height=520, interval="60", theme="light", chart_type="1"):
+    components.html(_tv_html(symbol, height, interval, theme, chart_type), height=height+2)
+
+_SPARK_TEMPLATE = go.Figure(go.Scattergl(x=None, y=[], mode="lines", line=dict(width=2), hoverinfo="skip"))
+_SPARK_TEMPLATE.update_layout(
+    height=56, margin=dict(l=0, r=0, t=0, b=0),
+    xaxis_visible=False, yaxis_visible=False,
+    hovermode=False,
+)
 
 def sparkline(series):
     if len(series) < 2:
         return None
-    fig = px.line(pd.DataFrame({"v": series}))
-    fig.update_traces(line=dict(width=2), hovertemplate=None)
-    fig.update_layout(
-        height=56, margin=dict(l=0, r=0, t=0, b=0),
-        xaxis=dict(visible=False), yaxis=dict(visible=False),
-        hovermode=False,
-    )
+    fig = go.Figure(_SPARK_TEMPLATE)
+    fig.data[0].y = series
     return fig
 
-def plot_chart(fig, key: str):
+def plot_chart(fig, key: str, slot=None):
     if fig is not None:
-        st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False}, key=key)
+        (slot or st).plotly_chart(fig, use_container_width=True, config={"displayModeBar": False}, key=key)
+
+def cached_tile(key: str, sig, build):
+    # Rebuild a tile's (html, fig) only when its signature (e.g. last price) moved
+    cache = st.session_state.setdefault("tile_cache", {})
+    hit = cache.get(key)
+    if hit is None or hit[0] != sig:
+        hit = cache[key] = (sig, *build())
+    return hit[1], hit[2]
 
 # Weather helpers
 @st.cache_data(ttl=300)
-def get_weather(city, unit="metric"):
+def get_weather(city, u="metric"):
     if not OWM_KEY:
         return {"error": "Set OWM_API_KEY in .env"}
-    u = "metric" if "metric" in unit else "imperial"
     try:
-        r = requests.get(
+        r = SESSION.get(
             "https://api.openweathermap.org/data/2.5/weather",
             params={"q": city, "appid": OWM_KEY, "units": u},
             timeout=8,
@@ -226,6 +270,31 @@ def get_weather(city, unit="metric"):
     except Exception as e:
         return {"error": str(e)}
 
+@st.cache_resource(show_spinner=False)
+def _owm_city_ids():
+    # city -> OWM city id, learned from successful /weather responses (the geocoding API has no ids)
+    return {}
+
+@st.cache_data(ttl=300)
+def get_weather_batch(ids: tuple, u="metric"):
+    # /group returns current conditions for up to 20 city ids per request
+    if not OWM_KEY or not ids:
+        return {}
+    out = {}
+    for i in range(0, len(ids), 20):
+        try:
+            r = SESSION.get(
+                "https://api.openweathermap.org/data/2.5/group",
+                params={"id": ",".join(map(str, ids[i:i+20])), "units": u, "appid": OWM_KEY},
+                timeout=8,
+            )
+            for item in r.json().get("list", []):
+                item.setdefault("cod", 200)  # group items omit it; keep the /weather shape
+                out[item["id"]] = item
+        except Exception:
+            continue
+    return out
+
 @st.cache_data(ttl=24*3600)
 def owm_geocode(city_country: str):
     if not OWM_KEY:
@@ -240,9 +309,9 @@ def owm_geocode(city_country: str):
 
         url = "https://api.openweathermap.org/geo/1.0/direct"
         q = f"{city},{cc}" if cc else city
-        data = requests.get(url, params={"q": q, "limit": 1, "appid": OWM_KEY}, timeout=8).json()
+        data = SESSION.get(url, params={"q": q, "limit": 1, "appid": OWM_KEY}, timeout=8).json()
         if not data and cc:
-            data = requests.get(url, params={"q": city, "limit": 1, "appid": OWM_KEY}, timeout=8).json()
+            data = SESSION.get(url, params={"q": city, "limit": 1, "appid": OWM_KEY}, timeout=8).json()
         if data:
             name = f'{data[0].get("name", city)}{", " + data[0].get("country","") if data[0].get("country") else ""}'
             return data[0]["lat"], data[0]["lon"], name
@@ -251,148 +320,257 @@ def owm_geocode(city_country: str):
     return None, None, city_country
 
 @st.cache_data(ttl=12*3600)
-def wx_history_daily(city_country: str, days_back: int = 7, units: str = "metric"):
+def wx_history_daily(city_country: str, start_dt: _dt, end_dt: _dt, u: str = "metric"):
     lat, lon, resolved = owm_geocode(city_country)
     if lat is None or lon is None:
         return {"error": "geocode_failed", "name": resolved}
     try:
-        p = Point(lat, lon)
-        end_d: _date = _date.today()
-        start_d: _date = end_d - _timedelta(days=days_back)
-        start_dt = _dt.combine(start_d, _dt.min.time())
-        end_dt   = _dt.combine(end_d,   _dt.min.time())
-        df = Daily(p, start_dt, end_dt).fetch()
+        df = Daily(Point(lat, lon), start_dt, end_dt).fetch()
         if df is None or df.empty:
             return {"name": resolved, "rows": []}
-        if "imperial" in units:
+        if u == "imperial":
             df["tmin"] = df["tmin"] * 9/5 + 32
             df["tmax"] = df["tmax"] * 9/5 + 32
-        rows = []
-        for d, r in df.iterrows():
-            rows.append({
-                "date": pd.Timestamp(d).date().isoformat(),
-                "low": float(r.tmin) if pd.notna(r.tmin) else None,
-                "high": float(r.tmax) if pd.notna(r.tmax) else None,
-                "prcp": float(r.prcp) if "prcp" in df.columns and pd.notna(r.prcp) else 0.0
-            })
+        df = df.reset_index().rename(columns={"time": "date"})
+        if "prcp" not in df.columns:
+            df["prcp"] = 0.0
+        df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+        df[["tmin", "tmax", "prcp"]] = df[["tmin", "tmax", "prcp"]].astype(float)
+        df["prcp"] = df["prcp"].fillna(0.0)
+        df = df[["date", "tmin", "tmax", "prcp"]].rename(columns={"tmin": "low", "tmax": "high"})
+        rows = df.astype(object).where(pd.notna(df), None).to_dict("records")
         return {"name": resolved, "rows": rows}
     except Exception as e:
         return {"error": str(e), "name": resolved}
 
 @st.cache_data(ttl=30*60)
-def wx_forecast_daily(city_country: str, units: str = "metric"):
+def wx_forecast_daily(city_country: str, u: str = "metric"):
     lat, lon, resolved = owm_geocode(city_country)
     if lat is None or lon is None:
         return {"error": "geocode_failed", "name": resolved}
     try:
-        u = "metric" if "metric" in units else "imperial"
-        r = requests.get(
+        r = SESSION.get(
             "https://api.openweathermap.org/data/2.5/forecast",
             params={"lat": lat, "lon": lon, "appid": OWM_KEY, "units": u},
             timeout=10
         )
         lst = r.json().get("list", [])
-        day = {}
-        for item in lst:
-            d = pd.to_datetime(item["dt"], unit="s").date()
-            t = float(item["main"]["temp"])
-            rmm = 0.0
-            if "rain" in item and isinstance(item["rain"], dict):
-                rmm = float(item["rain"].get("3h", 0.0))
-            if d not in day:
-                day[d] = {"low": t, "high": t, "prcp": rmm}
-            else:
-                day[d]["low"] = min(day[d]["low"], t)
-                day[d]["high"] = max(day[d]["high"], t)
-                day[d]["prcp"] += rmm
-        rows = [{"date": d.isoformat(), "low": v["low"], "high": v["high"], "prcp": v["prcp"]}
-                for d, v in sorted(day.items())][:5]
+        if not lst:
+            return {"name": resolved, "rows": []}
+        df = pd.DataFrame(lst)
+        df["date"] = pd.to_datetime(df["dt"], unit="s").dt.date
+        df["temp"] = df["main"].map(lambda m: m["temp"]).astype(float)
+        if "rain" in df.columns:
+            df["prcp"] = df["rain"].map(lambda r: r.get("3h", 0.0) if isinstance(r, dict) else 0.0).astype(float)
+        else:
+            df["prcp"] = 0.0
+        agg = (df.groupby("date")
+                 .agg(low=("temp", "min"), high=("temp", "max"), prcp=("prcp", "sum"))
+                 .reset_index().head(5))
+        rows = agg.assign(date=agg["date"].astype(str)).to_dict("records")
         return {"name": resolved, "rows": rows}
     except Exception as e:
         return {"error": str(e), "name": resolved}
 
+@st.cache_data(ttl=300)
+def fetch_all_weather(locs: tuple, start_dt: _dt, end_dt: _dt, u: str = "metric"):
+    # Fan out now / past / forecast for every city at once (I/O bound)
+    if not locs:
+        return {}
+    city_ids = _owm_city_ids()
+    ctx = get_script_run_ctx()
+    jobs = {}
+    # Workers call st.cache_data helpers: they need the script's run context, and each job
+    # runs in a copy of this context so the nested-cache flag suppresses their spinners
+    with ThreadPoolExecutor(max_workers=min(16, 3 * len(locs)),
+                            initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as ex:
+        def submit(fn, *args):
+            return ex.submit(contextvars.copy_context().run, fn, *args)
+
+        for loc in locs:
+            if loc not in city_ids:
+                jobs[(loc, "now")] = submit(get_weather, loc, u)
+            jobs[(loc, "hist")] = submit(wx_history_daily, loc, start_dt, end_dt, u)
+            jobs[(loc, "fc")] = submit(wx_forecast_daily, loc, u)
+        out = {}
+        for k, fut in jobs.items():
+            try:
+                out[k] = fut.result()
+            except Exception as e:
+                out[k] = {"error": str(e)}
+    # Cold cities already have their /weather payload; remember the id only when it succeeded
+    for loc in locs:
+        cur = out.get((loc, "now"))
+        if isinstance(cur, dict) and cur.get("cod") == 200 and "id" in cur:
+            city_ids[loc] = cur["id"]
+    warm = [loc for loc in locs if (loc, "now") not in out]
+    now = get_weather_batch(tuple(sorted({city_ids[loc] for loc in warm})), u)
+    for loc in warm:
+        # single-city path only when the batch did not return this id
+        out[(loc, "now")] = now.get(city_ids[loc]) or get_weather(loc, u)
+    return out
+
+def _col(rows: list, key: str):
+    return np.fromiter((np.nan if r.get(key) is None else r[key] for r in rows),
+                       dtype=np.float64, count=len(rows))
+
 def plot_band_hi_lo(title: str, rows: list):
     if not rows: return None
-    df = pd.DataFrame(rows)
-    df["avg"] = (df["low"] + df["high"]) / 2.0
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df["date"], y=df["low"], mode="lines", name="Low"))
-    fig.add_trace(go.Scatter(x=df["date"], y=df["high"], mode="lines", name="High", fill="tonexty"))
-    fig.add_trace(go.Scatter(x=df["date"], y=df["avg"], mode="lines", name="Avg",
-                             line=dict(width=1, dash="dot")))
+    dates = [r["date"] for r in rows]
+    lows, highs = _col(rows, "low"), _col(rows, "high")
+    fig = go.Figure([
+        go.Scatter(x=dates, y=lows, mode="lines", name="Low"),
+        go.Scatter(x=dates, y=highs, mode="lines", name="High", fill="tonexty"),
+        go.Scatter(x=dates, y=(lows + highs) * 0.5, mode="lines", name="Avg",
+                   line=dict(width=1, dash="dot")),
+    ])
     fig.update_layout(title=title, margin=dict(l=10, r=10, t=36, b=0), height=260, legend_title="")
     return fig
 
 def plot_precip_bars(title: str, rows: list):
     if not rows: return None
-    df = pd.DataFrame(rows)
-    if "prcp" not in df.columns: return None
-    fig = px.bar(df, x="date", y="prcp", title=title)
-    fig.update_layout(margin=dict(l=10, r=10, t=36, b=0), height=220, yaxis_title="mm", xaxis_title="")
+    fig = go.Figure(go.Bar(x=[r["date"] for r in rows], y=_col(rows, "prcp")))
+    fig.update_layout(title=title, margin=dict(l=10, r=10, t=36, b=0), height=220, yaxis_title="mm", xaxis_title="")
     return fig
 
 # ----- Stocks (yfinance) -----
+@st.cache_resource(show_spinner=False)
+def _yf_session():
+    # yfinance requires a curl_cffi session; it keeps its own connection pool
+    return curl_requests.Session(impersonate="chrome")
+
 @st.cache_data(ttl=60)
-def fetch_stock(ticker):
-    if ticker.upper().endswith("USDT"):
-        return None
-    for period, interval in [("1d", "1m"), ("5d", "5m"), ("1mo", "1d")]:
+def fetch_stocks_batch(tickers: tuple):
+    tickers = tuple(t for t in tickers if not t.upper().endswith("USDT"))
+    if not tickers:
+        return {}
+    try:
+        df = yf.download(tickers=list(tickers), period="1d", interval="1m", group_by="ticker",
+                         progress=False, auto_adjust=False, threads=True, session=_yf_session())
+    except Exception:
+        return {}
+    if df is None or df.empty:
+        return {}
+    multi = isinstance(df.columns, pd.MultiIndex)
+    stats = {}
+    for tkr in tickers:
         try:
-            df = yf.download(tickers=ticker, period=period, interval=interval,
-                             progress=False, auto_adjust=False)
-            if df is None or df.empty or "Close" not in df.columns:
+            sub = df[tkr] if multi else df
+            sub = sub.dropna(subset=["Close"])
+            if sub.empty:
                 continue
-            df = df.reset_index()
-            last = float(df["Close"].iloc[-1]); prev = float(df["Close"].iloc[0])
-            return {
+            last = float(sub["Close"].iloc[-1]); prev = float(sub["Close"].iloc[0])
+            stats[tkr] = {
                 "last": last,
                 "pct": (last - prev) / prev * 100 if prev else 0.0,
-                "high": float(df["High"].max()),
-                "low": float(df["Low"].min()),
-                "spark": df["Close"].tail(60).tolist()
+                "high": float(sub["High"].max()),
+                "low": float(sub["Low"].min()),
+                "spark": sub["Close"].tail(60).to_numpy().tolist()
             }
         except Exception:
             continue
-    return None
+    return stats
 
 # ----- Crypto WS -----
-crypto_q = queue.Queue()
+# Kept in session_state so the WS thread and later reruns share the same objects
+crypto_q = st.session_state.setdefault("crypto_q", queue.Queue(maxsize=10_000))
+PRICE_TICK = st.session_state.setdefault("price_tick", threading.Event())
 def on_msg(ws, msg):
-    import json as _json
-    d = _json.loads(msg)
+    d = _json_loads(msg)
+    stream = d.get("stream", "")
+    d = d.get("data", d)  # combined streams wrap the payload
     p = float(d.get("p") or d.get("c") or d.get("price"))
-    s = d.get("s") or d.get("stream","").split("@")[0].upper()
-    crypto_q.put((s, p, time.time()))
+    s = d.get("s") or stream.split("@", 1)[0].upper()
+    try:
+        crypto_q.put_nowait((s, p, time.time()))
+    except queue.Full:  # nobody is draining (tab idle); drop the tick
+        return
+    PRICE_TICK.set()
 
-def start_crypto_ws(symbols):
+def _session_alive(session_id):
+    try:
+        return runtime.get_instance().is_active_session(session_id)
+    except Exception:
+        return True
+
+def start_crypto_ws(symbols, stop, session_id=None):
     if not symbols: return
     streams = "/".join([f"{s}@trade" for s in symbols])
     url = f"wss://stream.binance.com:9443/stream?streams={streams}"
-    ws = WebSocketApp(url, on_message=on_msg)
-    ws.run_forever()
+    ws = WebSocketApp(url, on_message=on_msg, on_close=lambda *a: None, on_error=lambda *a: None)
+
+    def watchdog():
+        # Stop once the owning Streamlit session is gone
+        while not stop.wait(5):
+            if session_id and not _session_alive(session_id):
+                stop.set()
+        ws.close()
+
+    threading.Thread(target=watchdog, daemon=True).start()
+    while not stop.is_set():
+        try:
+            ws.run_forever(ping_interval=20, ping_timeout=10, reconnect=5, skip_utf8_validation=True)
+        except Exception:
+            pass
+        stop.wait(2)
 
 def binance_rest_price(symbol_upper: str):
     try:
         url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol_upper}"
-        r = requests.get(url, timeout=6); r.raise_for_status()
+        r = SESSION.get(url, timeout=6); r.raise_for_status()
         return float(r.json()["price"])
     except Exception:
         return None
 
-if "ws_started" not in st.session_state:
-    syms = [s.strip().lower() for s in tile_crypto if s.strip()]
-    threading.Thread(target=start_crypto_ws, args=(syms,), daemon=True).start()
-    st.session_state.ws_started = True
+# (Re)start the WS thread on a full run if it never started or its watchdog stopped it
+# while the session was disconnected. Each thread gets its own stop Event so a stale
+# thread that has not exited yet can never be revived by a shared flag.
+_ws_thread = st.session_state.get("ws_thread")
+syms = [s.strip().lower() for s in tile_crypto if s.strip()]
+if syms and (_ws_thread is None or not _ws_thread.is_alive() or st.session_state.ws_stop.is_set()):
+    if _ws_thread is not None:
+        st.session_state.ws_stop.set()
+    ctx = get_script_run_ctx()
+    st.session_state.ws_stop = threading.Event()
+    st.session_state.ws_thread = threading.Thread(
+        target=start_crypto_ws, args=(syms, st.session_state.ws_stop, ctx.session_id if ctx else None),
+        daemon=True)
+    st.session_state.ws_thread.start()
+
+HIST_LEN = 120
+
+def ring_new():
+    return {"buf": np.zeros(HIST_LEN, dtype=np.float64), "n": 0, "last": 0.0}
+
+def ring_push(d, p):
+    d["buf"][d["n"] % HIST_LEN] = p
+    d["n"] += 1
+    d["last"] = p
+
+def ring_tail(d, k=60):
+    # Oldest-to-newest view of the last k prices
+    n, buf = d["n"], d["buf"]
+    if n < HIST_LEN:
+        return buf[:n][-k:]
+    i = n % HIST_LEN
+    return np.concatenate((buf[i:], buf[:i]))[-k:]
 
 if "crypto_prices" not in st.session_state:
     st.session_state.crypto_prices = {}
-while not crypto_q.empty():
-    s, p, t = crypto_q.get()
-    key = s.lower()
-    hist = st.session_state.crypto_prices.get(key, {"last": p, "hist": []})
-    hist["last"] = p
-    hist["hist"] = (hist["hist"] + [p])[-120:]
-    st.session_state.crypto_prices[key] = hist
+def drain_crypto_q():
+    msgs = []
+    try:
+        while True:
+            msgs.append(crypto_q.get_nowait())
+    except queue.Empty:
+        pass
+    for s, p, t in msgs:
+        d = st.session_state.crypto_prices.get(s.lower())
+        if d is None:
+            d = st.session_state.crypto_prices[s.lower()] = ring_new()
+        ring_push(d, p)
+
+drain_crypto_q()
 
 # ----- Football (football-data.org) -----
 FD_BASE = "https://api.football-data.org/v4"
@@ -404,28 +582,113 @@ FD_LEAGUES = {
     "Ligue 1 (FRA)": "FL1",
 }
 
+FD_VALIDATORS_MAX = 64
+
+@st.cache_resource(show_spinner=False)
+def _fd_validators():
+    # (path, params) -> {"etag", "last_modified", "body"} for conditional GETs, LRU-capped
+    return threading.Lock(), OrderedDict()
+
+# Column schemas for the football tables (nullable ints; API fields may be null)
+MATCHES_COLS = [("Kickoff (UTC)", "string"), ("Home", "string"), ("Away", "string"),
+                ("Score", "string"), ("Status", "string"), ("Competition", "string")]
+STANDINGS_COLS = [("Pos", "Int16"), ("Team", "string"), ("P", "Int16"), ("W", "Int16"), ("D", "Int16"),
+                  ("L", "Int16"), ("GF", "Int16"), ("GA", "Int16"), ("Pts", "Int16")]
+SCORERS_COLS = [("Player", "string"), ("Team", "string"), ("Goals", "Int16"),
+                ("Assists", "Int16"), ("Apps", "Int16")]
+
+def fd_frame(rows: list, schema: list):
+    return pd.DataFrame.from_records(rows, columns=[c for c, _ in schema]).astype(dict(schema), errors="ignore")
+
 def fd_get(path, params=None, timeout=10):
     headers = {"X-Auth-Token": FD_TOKEN} if FD_TOKEN else {}
+    key = (path, tuple(sorted((params or {}).items())))
+    lock, validators = _fd_validators()
+    with lock:
+        prev = validators.get(key)
+        if prev:
+            validators.move_to_end(key)
+    if prev:
+        if prev["etag"]: headers["If-None-Match"] = prev["etag"]
+        if prev["last_modified"]: headers["If-Modified-Since"] = prev["last_modified"]
     try:
-        r = requests.get(f"{FD_BASE}/{path}", headers=headers, params=params or {}, timeout=timeout)
+        r = SESSION.get(f"{FD_BASE}/{path}", headers=headers, params=params or {}, timeout=timeout)
     except Exception as e:
         return {"error": f"network: {e}"}
+    if r.status_code == 304 and prev:
+        return prev["body"]
     try:
-        return r.json()
+        body = r.json()
     except Exception:
         return {"error": "bad_json", "status": r.status_code, "preview": (r.text or "")[:200]}
+    etag, last_mod = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    if r.ok and (etag or last_mod):
+        with lock:
+            validators[key] = {"etag": etag, "last_modified": last_mod, "body": body}
+            validators.move_to_end(key)
+            while len(validators) > FD_VALIDATORS_MAX:
+                validators.popitem(last=False)
+    return body
 
 @st.cache_data(ttl=600)
 def fd_standings(code: str): return fd_get(f"competitions/{code}/standings")
 
-@st.cache_data(ttl=120)
+@st.cache_data(ttl=60)
 def fd_matches_today(code: str):
     today = pd.Timestamp.utcnow().date().isoformat()
     return fd_get(f"competitions/{code}/matches", params={"dateFrom": today, "dateTo": today})
 
-@st.cache_data(ttl=600)
+@st.cache_data(ttl=3600)
 def fd_scorers(code: str): return fd_get(f"competitions/{code}/scorers")
 
+# ---------------- Alert config ----------------
+@st.cache_data(ttl=None)
+def parse_alerts(txt: str):
+    # {symbol: float target}, or None when the JSON is invalid
+    try:
+        raw = json.loads(txt) if txt.strip() else {}
+        return {str(k): float(v) for k, v in raw.items()}
+    except Exception:
+        return None
+
+alerts = parse_alerts(alert_cfg)
+if alerts is None:
+    alerts = {}
+    st.sidebar.error("Invalid JSON for alerts")
+
+def hit_alert(symbol, price, target):
+    key = (symbol, "alerted", target)
+    if not st.session_state.get(key):
+        st.toast(f"🔔 {symbol} crossed {target:.2f} (now {price:.2f})", icon="⚡")
+        st.session_state[key] = True
+
+# ----- Crypto tiles -----
+@st.fragment(run_every=1.0)
+def crypto_tiles(symbols: list, alerts: dict):
+    # Reruns on its own every second; only drains and rebuilds after the WS thread flagged a trade
+    if PRICE_TICK.is_set():
+        PRICE_TICK.clear()
+        drain_crypto_q()
+        for k, v in st.session_state.crypto_prices.items():
+            target = alerts.get(k.upper())
+            if target is not None and v["last"] >= target:
+                hit_alert(k.upper(), v["last"], target)
+    for sym in symbols:
+        pack = st.session_state.crypto_prices.get(sym.lower())
+        html_slot, chart_slot = st.empty(), st.empty()
+        if not pack:
+            html_slot.markdown(f"<div class='kpi'><div class='label'>{sym.upper()}</div><div class='caption-muted'>no data</div></div>", unsafe_allow_html=True)
+            continue
+
+        def build(sym=sym, pack=pack):
+            html = (f"<div class='kpi'><div class='label'>{sym.upper()}</div>"
+                    f"<div class='row'><div class='value'>{pack['last']:.2f}</div></div></div>")
+            return html, sparkline(ring_tail(pack))
+
+        html, fig = cached_tile(f"crypto-{sym.lower()}", pack["n"], build)
+        html_slot.markdown(html, unsafe_allow_html=True)
+        plot_chart(fig, key=f"spark-crypto-{sym.lower()}", slot=chart_slot)
+
 # ---------------- Tabs (with pill look) ----------------
 st.markdown('<div class="top-tabs">', unsafe_allow_html=True)
 tab_markets, tab_weather, tab_football = st.tabs(["📈 Markets", "⛅ Weather", "⚽ Football"])
@@ -449,6 +712,7 @@ with tab_markets:
     tv_embed(crypto_symbol, height=520, interval="15", theme="light", chart_type="1")
 
     st.markdown("### KPI Tiles")
+    stats = fetch_stocks_batch(tuple(sorted(tile_stocks)))
     left, right = st.columns([1.6, 1])
 
     with left:
@@ -458,15 +722,17 @@ with tab_markets:
         else:
             cols = st.columns(min(4, len(tile_stocks)))
             for i, tkr in enumerate(tile_stocks):
-                data = fetch_stock(tkr)
-                with cols[i % len(cols)]:
-                    if not data:
-                        st.markdown(f'<div class="kpi"><div class="label">{tkr}</div><div class="caption-muted">no data</div></div>', unsafe_allow_html=True)
-                        continue
+                data = stats.get(tkr)
+                col = cols[i % len(cols)]
+                html_slot, chart_slot = col.empty(), col.empty()
+                if not data:
+                    html_slot.markdown(f'<div class="kpi"><div class="label">{tkr}</div><div class="caption-muted">no data</div></div>', unsafe_allow_html=True)
+                    continue
+
+                def build(tkr=tkr, data=data):
                     delta = f"{data['pct']:+.2f}%"
                     cls = "kpi down" if data['pct'] < 0 else "kpi"
-                    st.markdown(
-                        f"""
+                    html = f"""
                         <div class="{cls}">
                           <div class="label">{tkr}</div>
                           <div class="row">
@@ -475,34 +741,26 @@ with tab_markets:
                           </div>
                           <div class="caption-muted">H:{data['high']:.2f} • L:{data['low']:.2f}</div>
                         </div>
-                        """,
-                        unsafe_allow_html=True,
-                    )
-                    fig = sparkline(data["spark"])
-                    if fig: plot_chart(fig, key=f"spark-stock-{tkr}")
+                        """
+                    return html, sparkline(data["spark"])
+
+                sig = (data["last"], data["pct"], data["high"], data["low"], tuple(data["spark"]))
+                html, fig = cached_tile(f"stock-{tkr}", sig, build)
+                html_slot.markdown(html, unsafe_allow_html=True)
+                plot_chart(fig, key=f"spark-stock-{tkr}", slot=chart_slot)
 
     with right:
         st.write("**Crypto (realtime)**")
         if not tile_crypto:
             st.info("Add crypto pairs in the sidebar.")
         else:
-            # bootstrap if WS blocked
+            # bootstrap if WS blocked (full runs only, not in the 1s fragment)
             if not st.session_state.crypto_prices:
                 for s in tile_crypto:
                     p = binance_rest_price(s.upper())
                     if p is not None:
-                        st.session_state.crypto_prices[s] = {"last": p, "hist": [p]}
-            for sym in tile_crypto:
-                pack = st.session_state.crypto_prices.get(sym.lower())
-                st.markdown('<div class="kpi">', unsafe_allow_html=True)
-                if not pack:
-                    st.markdown(f"<div class='label'>{sym.upper()}</div><div class='caption-muted'>no data</div>", unsafe_allow_html=True)
-                else:
-                    st.markdown(f"<div class='label'>{sym.upper()}</div>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='row'><div class='value'>{pack['last']:.2f}</div></div>", unsafe_allow_html=True)
-                    fig = sparkline(pack.get("hist", [])[-60:])
-                    if fig: plot_chart(fig, key=f"spark-crypto-{sym.lower()}")
-                st.markdown('</div>', unsafe_allow_html=True)
+                        ring_push(st.session_state.crypto_prices.setdefault(s, ring_new()), p)
+            crypto_tiles(tile_crypto, alerts)
 
 # ---------------- Weather ----------------
 with tab_weather:
@@ -511,15 +769,23 @@ with tab_weather:
         unsafe_allow_html=True,
     )
     st.write("**Now • Past 7 days • Next 5 days**")
+    units = st.session_state.get("wx_units", "metric")
+    is_imperial = "imperial" in units
+    u = "imperial" if is_imperial else "metric"
+    today = _date.today()
+    min_time = _dt.min.time()
+    end_dt = _dt.combine(today, min_time)
+    start_dt = _dt.combine(today - _timedelta(days=7), min_time)
     if not selected_locations:
         st.info("Select locations in the sidebar.")
     else:
+        wx = fetch_all_weather(tuple(selected_locations), start_dt, end_dt, u)
         cols = st.columns(1 if len(selected_locations) == 1 else 2)
         for i, loc in enumerate(selected_locations):
             with cols[i % len(cols)]:
                 st.markdown('<div class="card">', unsafe_allow_html=True)
 
-                current = get_weather(loc, st.session_state.get("wx_units", "metric"))
+                current = wx.get((loc, "now"))
                 if isinstance(current, dict) and current.get("cod") == 200:
                     w0 = current["weather"][0]
                     icon = w0.get("icon")
@@ -543,7 +809,7 @@ with tab_weather:
                 else:
                     st.warning(f"{loc}: current conditions unavailable")
 
-                hist = wx_history_daily(loc, days_back=7, units=st.session_state.get("wx_units","metric"))
+                hist = wx.get((loc, "hist")) or {}
                 if isinstance(hist, dict) and "error" in hist:
                     st.warning(f"Past 7 days: {hist['error']}")
                 else:
@@ -554,7 +820,7 @@ with tab_weather:
                     if fig_pr: plot_chart(fig_pr, key=f"wx-prcp-hist-{i}-{loc}")
                     elif not rows_h: st.info("No historical data.")
 
-                fc = wx_forecast_daily(loc, units=st.session_state.get("wx_units","metric"))
+                fc = wx.get((loc, "fc")) or {}
                 if isinstance(fc, dict) and "error" in fc:
                     st.warning(f"Forecast: {fc['error']}")
                 else:
@@ -602,7 +868,7 @@ with tab_football:
                             "Status": m.get("status"),
                             "Competition": (m.get("competition") or {}).get("name"),
                         })
-                    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+                    st.dataframe(fd_frame(rows, MATCHES_COLS), use_container_width=True, hide_index=True)
 
         with subtab2:
             st_data = fd_standings(code)
@@ -626,7 +892,7 @@ with tab_football:
                             "GA": t.get("goalsAgainst"),
                             "Pts": t.get("points"),
                         })
-                    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+                    st.dataframe(fd_frame(rows, STANDINGS_COLS), use_container_width=True, hide_index=True)
 
         with subtab3:
             scorers = fd_scorers(code)
@@ -644,34 +910,27 @@ with tab_football:
                             "Assists": s_.get("assists"),
                             "Apps": s_.get("playedMatches") or s_.get("appearances"),
                         })
-                    df = pd.DataFrame(rows).sort_values(["Goals","Assists"], ascending=False, na_position="last")
+                    df = fd_frame(rows, SCORERS_COLS)
+                    # nlargest drops NA tie-breakers, so rank missing assists last instead
+                    df = (df.assign(_a=df["Assists"].fillna(-1))
+                            .nlargest(50, ["Goals", "_a"]).drop(columns="_a"))
                     st.dataframe(df, use_container_width=True, hide_index=True)
 
 # ---------------- Alerts ----------------
-try:
-    alerts = json.loads(alert_cfg) if alert_cfg.strip() else {}
-except Exception:
-    alerts = {}
-    st.sidebar.error("Invalid JSON for alerts")
-
-def hit_alert(symbol, price, target):
-    key = (symbol, "alerted", target)
-    if not st.session_state.get(key):
-        st.toast(f"🔔 {symbol} crossed {target:.2f} (now {price:.2f})", icon="⚡")
-        st.session_state[key] = True
-
-for tkr in tile_stocks:
-    if tkr in alerts:
-        dat = fetch_stock(tkr)
-        if dat and dat["last"] >= float(alerts[tkr]):
-            hit_alert(tkr, dat["last"], float(alerts[tkr]))
-
-for sym, pack in st.session_state.crypto_prices.items():
-    key = sym.upper()
-    if key in alerts and pack["last"] >= float(alerts[key]):
-        hit_alert(key, pack["last"], float(alerts[key]))
+prices = {t: stats[t]["last"] for t in tile_stocks if stats.get(t)}
+prices.update({k.upper(): v["last"] for k, v in st.session_state.crypto_prices.items()})
+for sym, target in alerts.items():
+    p = prices.get(sym)
+    if p is not None and p >= target:
+        hit_alert(sym, p, target)
 
 # ---------------- Auto-refresh ----------------
-if st.session_state.get("last_refresh") and time.time() - st.session_state["last_refresh"] > refresh:
-    st.rerun()
+# Whole page (stocks, weather, football) reruns every `refresh` seconds;
+# the crypto tiles refresh on their own inside their fragment.
+@st.fragment(run_every=refresh)
+def auto_refresh():
+    if time.time() - st.session_state.get("last_refresh", 0) >= refresh - 1:
+        st.rerun()
+
 st.session_state["last_refresh"] = time.time()
+auto_refresh()